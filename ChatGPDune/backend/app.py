@@ -1,19 +1,65 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, constr
 from langchain_ollama import OllamaLLM
 from langchain_community.embeddings import OllamaEmbeddings
 from langchain_community.vectorstores import Neo4jVector
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import re
+import sys
+import json
+import math
+import time
+import asyncio
 import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from typing import List, Dict, Optional
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown for shared resources (replaces the deprecated on_event hooks)"""
+    # Give the default thread pool some headroom so blocking Ollama/Neo4j calls
+    # offloaded with asyncio.to_thread don't starve each other under load
+    # (asyncio.to_thread runs on the loop's default executor, not anyio's)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=16))
+
+    global model_queue, model_worker
+    model_queue = asyncio.Queue()
+    model_worker = asyncio.create_task(server_loop(model_queue))
+    model_worker.add_done_callback(restart_model_worker)
+
+    if not initialize_vector_store():
+        logger.warning("Failed to initialize vector store - RAG will not work properly")
+
+    # Pull the corpus into the in-process index off the event loop; retrieval
+    # falls back to per-query Neo4j searches until (unless) it finishes
+    asyncio.create_task(asyncio.to_thread(build_local_index))
+
+    # Warm up in the background so startup doesn't block on model loading
+    asyncio.create_task(warm_up_models())
+
+    yield
+
+    # Deterministic cleanup on shutdown
+    global vector_store
+    if model_worker:
+        model_worker.cancel()
+        model_worker = None
+    if vector_store:
+        vector_store = None
+    llm_instances.clear()
+    logger.info("Cleaned up resources")
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -64,7 +110,37 @@ AVAILABLE_MODELS = {
 
 DEFAULT_MODEL = "deepseek-r1"
 
-BASE_PROMPT = (
+# Hot-path regex, compiled once at import time
+GLAUCO_RE = re.compile(r"glauco", re.IGNORECASE)
+
+def strip_think(text: str) -> str:
+    """Remove <think>...</think> blocks with a manual index scan. str.find is a
+    C memmem, which beats the regex engine for a handful of tags, and the
+    first find doubles as the is-there-even-a-tag prefilter"""
+    start = text.find("<think>")
+    if start == -1:
+        return text
+
+    parts = []
+    pos = 0
+    while True:
+        start = text.find("<think>", pos)
+        if start == -1:
+            parts.append(text[pos:])
+            break
+        end = text.find("</think>", start + 7)
+        if end == -1:
+            # Unterminated block - leave it alone, same as the old regex did
+            parts.append(text[pos:])
+            break
+        parts.append(text[pos:start])
+        pos = end + 8
+    return "".join(parts).strip()
+
+# The prompt is split so the instruction preamble stays byte-identical across
+# requests (per model) - that way Ollama's KV cache can reuse the prefill for
+# the whole static prefix and only the context + question get prefilled fresh.
+BASE_PROMPT_PREFIX = (
     "Your name is ChatGPDune."
     "You were created by Sortphy."
     "You are a chatbot based on the {model_name} model, ran locally with Ollama."
@@ -78,11 +154,33 @@ BASE_PROMPT = (
     "You can use markdown formatting (headers, lists, code blocks, etc.) when it would make your response clearer and more readable. Avoind using bold when not necessary."
     "If you feel that the user is being friendly, be friendly and engaging in your responses. You can use a bit of humor, but always keep it appropriate and relevant to the Dune universe and always be objetive and factual. You main priority is to answer the user's question.\n\n"
     "Use the following context from the Dune universe to answer the question:\n"
-    "CONTEXT:\n{context}\n\n"
-    "Question: {question}\n\n"
+    "CONTEXT:\n"
+)
+
+BASE_PROMPT_SUFFIX = (
+    "\n\nQuestion: {question}\n\n"
     "Answer based on the provided context:"
 )
 
+# Split the suffix around the question slot once at import time so the hot path
+# is a plain "".join of fragments with no format-spec parsing per request
+SUFFIX_BEFORE_QUESTION, SUFFIX_AFTER_QUESTION = BASE_PROMPT_SUFFIX.split("{question}")
+
+@lru_cache(maxsize=None)
+def get_prompt_prefix(model_id: str) -> str:
+    """Formatted (static) prompt prefix for a model, built once and reused"""
+    model_config = AVAILABLE_MODELS.get(model_id, AVAILABLE_MODELS[DEFAULT_MODEL])
+    return sys.intern(BASE_PROMPT_PREFIX.format(model_name=model_config["name"]))
+
+def build_full_prompt(model_id: str, context: str, question: str) -> str:
+    return "".join((
+        get_prompt_prefix(model_id),
+        context,
+        SUFFIX_BEFORE_QUESTION,
+        question,
+        SUFFIX_AFTER_QUESTION
+    ))
+
 # novo base prompt que o chatgpt fez, se nao ficar bom a gente volta pro de cima que foi feito a mao
 # OK ESSE NAO FICOU LEGAL OLHA ISSO KKKKKKKKK
 # https://imgur.com/a/yvzlJiG
@@ -120,8 +218,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize embeddings (only one needed for vector search)
-embeddings = OllamaEmbeddings(model=EMBED_MODEL)
+# Initialize embeddings once at module level - every caller shares this
+# instance (and its HTTP connection pool) instead of creating new clients
+embeddings = OllamaEmbeddings(model=EMBED_MODEL, base_url=OLLAMA_URL)
 
 # Initialize Neo4j vector store (this connects to your existing data)
 vector_store = None
@@ -129,19 +228,144 @@ vector_store = None
 # Store LLM instances to avoid reinitializing
 llm_instances = {}
 
+# Exact-match cache: identical repeated questions (common in demos) are a plain
+# dict hit - no embedding, no Neo4j, no LLM. Checked before the semantic cache.
+EXACT_CACHE_MAX = 10000
+exact_cache = OrderedDict()
+
+def exact_cache_key(model_id: str, use_rag: bool, text: str) -> tuple:
+    """Normalize the question so trivial casing/whitespace differences still hit"""
+    return (model_id, use_rag, " ".join(text.split()).lower())
+
+def exact_cache_lookup(key: tuple) -> Optional[Dict]:
+    cached = exact_cache.get(key)
+    if cached is not None:
+        exact_cache.move_to_end(key)  # keep LRU order
+        logger.info("Exact cache hit")
+    return cached
+
+def exact_cache_store(key: tuple, response_data: Dict):
+    exact_cache[key] = response_data
+    exact_cache.move_to_end(key)
+    if len(exact_cache) > EXACT_CACHE_MAX:
+        exact_cache.popitem(last=False)
+
+# Retrieval cache: popular queries re-run the same Neo4j ANN search over and
+# over - keep the retrieved chunk lists around for a short TTL. Keyed on
+# (normalized question, top_k) so callers asking for different depths never
+# share an entry
+RETRIEVAL_CACHE_TTL = 300
+RETRIEVAL_CACHE_MAX = 1024
+RETRIEVAL_TOP_K = 5
+retrieval_cache = OrderedDict()
+
+def retrieval_cache_get(key: tuple) -> Optional[List[Dict]]:
+    entry = retrieval_cache.get(key)
+    if entry is None:
+        return None
+    timestamp, chunks = entry
+    if time.time() - timestamp > RETRIEVAL_CACHE_TTL:
+        del retrieval_cache[key]
+        return None
+    retrieval_cache.move_to_end(key)
+    return chunks
+
+def retrieval_cache_put(key: tuple, chunks: List[Dict]):
+    retrieval_cache[key] = (time.time(), chunks)
+    retrieval_cache.move_to_end(key)
+    if len(retrieval_cache) > RETRIEVAL_CACHE_MAX:
+        retrieval_cache.popitem(last=False)
+
+# Semantic response cache: repeated/paraphrased questions skip the LLM entirely
+# Entries are (key, normalized embedding, response_data), keyed per (model, use_rag)
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_CACHE_MAX = 1024
+SEMANTIC_CACHE_TTL = 3600  # seconds before a cached reply goes stale
+semantic_cache = []
+semantic_cache_hits = 0
+semantic_cache_misses = 0
+
+def normalize_embedding(embedding: List[float]) -> np.ndarray:
+    """L2-normalize an embedding so dot product == cosine similarity"""
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+def semantic_cache_lookup(key: tuple, query_embedding: np.ndarray) -> Optional[Dict]:
+    """Return the cached response for the nearest cached query, if close enough"""
+    global semantic_cache_hits, semantic_cache_misses
+
+    # Expire stale entries first (list is in insertion order, oldest up front)
+    cutoff = time.time() - SEMANTIC_CACHE_TTL
+    while semantic_cache and semantic_cache[0][3] < cutoff:
+        semantic_cache.pop(0)
+
+    best_score = -1.0
+    best_response = None
+    for cached_key, cached_emb, cached_response, _ in semantic_cache:
+        if cached_key != key:
+            continue
+        score = float(np.dot(cached_emb, query_embedding))
+        if score > best_score:
+            best_score = score
+            best_response = cached_response
+    if best_response is not None and best_score >= SEMANTIC_CACHE_THRESHOLD:
+        semantic_cache_hits += 1
+        logger.info("Semantic cache hit (similarity=%.4f)", best_score)
+        return best_response
+    semantic_cache_misses += 1
+    return None
+
+def semantic_cache_store(key: tuple, query_embedding: np.ndarray, response_data: Dict):
+    """Store a response in the semantic cache, evicting the oldest entry when full"""
+    if len(semantic_cache) >= SEMANTIC_CACHE_MAX:
+        semantic_cache.pop(0)
+    semantic_cache.append((key, query_embedding, response_data, time.time()))
+
+# Single-worker queue so only one generation hits Ollama at a time
+# (concurrent generations just thrash the GPU instead of finishing faster)
+model_queue = None
+model_worker = None
+
+# Shared by the batch worker and the streaming endpoint so streamed
+# generations also serialize GPU use instead of racing the queue
+gpu_lock = asyncio.Lock()
+
+def resolve_model(model_id: Optional[str]) -> tuple:
+    """Resolve a requested model to (model_id, config) with a single dict probe"""
+    model_config = AVAILABLE_MODELS.get(model_id)
+    if model_config is None:
+        return DEFAULT_MODEL, AVAILABLE_MODELS[DEFAULT_MODEL]
+    return model_id, model_config
+
 def get_llm_instance(model_id: str) -> OllamaLLM:
     """Get or create LLM instance for the specified model"""
     if model_id not in llm_instances:
         if model_id not in AVAILABLE_MODELS:
-            logger.warning(f"Unknown model {model_id}, using default {DEFAULT_MODEL}")
+            logger.warning("Unknown model %s, using default %s", model_id, DEFAULT_MODEL)
             model_id = DEFAULT_MODEL
         
         model_config = AVAILABLE_MODELS[model_id]
-        llm_instances[model_id] = OllamaLLM(model=model_config["model_id"])
-        logger.info(f"✓ Initialized LLM instance for {model_config['name']}")
+        # keep_alive stops Ollama from unloading the model (and its KV cache)
+        # between requests
+        llm_instances[model_id] = OllamaLLM(
+            model=model_config["model_id"],
+            base_url=OLLAMA_URL,
+            keep_alive="30m"
+        )
+        logger.info("✓ Initialized LLM instance for %s", model_config['name'])
     
     return llm_instances[model_id]
 
+@lru_cache(maxsize=4096)
+def _embed_query_cached(normalized_query: str) -> tuple:
+    """Cached Ollama embedding call - tuple so lru_cache can store it"""
+    return tuple(embeddings.embed_query(normalized_query))
+
+def embed_query(query: str) -> List[float]:
+    """Embed a query, reusing the cached vector for repeated/whitespace-variant queries"""
+    return list(_embed_query_cached(" ".join(query.split()).lower()))
+
 def initialize_vector_store():
     """Initialize connection to your existing Neo4j vector store"""
     global vector_store
@@ -159,163 +383,546 @@ def initialize_vector_store():
         logger.info("✓ Connected to existing Neo4j vector store")
         return True
     except Exception as e:
-        logger.error(f"✗ Failed to connect to Neo4j vector store: {e}")
+        logger.error("✗ Failed to connect to Neo4j vector store: %s", e)
+        return False
+
+# In-process vector index: all chunk embeddings pulled from Neo4j once at
+# startup into one numpy matrix. At this corpus size a brute-force dot product
+# over normalized vectors is sub-millisecond, so retrieval skips the Bolt
+# round-trip and Neo4j query planning entirely. Neo4j stays the source of
+# truth - if the load fails we just keep using it per query.
+local_index_matrix = None   # (n_chunks, dim) float32, L2-normalized rows
+local_index_chunks = []     # parallel list of {"text", "metadata"}
+
+# Lazy shared bolt driver for direct Cypher - one handshake for the process,
+# reused by the local-index load and the fallback retrieval path
+_bolt_driver = None
+
+def get_bolt_driver():
+    global _bolt_driver
+    if _bolt_driver is None:
+        from neo4j import GraphDatabase
+        _bolt_driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    return _bolt_driver
+
+def build_local_index():
+    """Load every chunk embedding out of Neo4j into an in-memory numpy index"""
+    global local_index_matrix, local_index_chunks
+    try:
+        vectors = []
+        chunks = []
+        with get_bolt_driver().session() as session:
+            result = session.run(
+                f"MATCH (n:{NODE_LABEL}) "
+                "RETURN n.text AS text, n.embedding AS emb, n.embedding_f16 AS emb_f16, "
+                "n.source_file AS source_file, n.source_type AS source_type"
+            )
+            for record in result:
+                # Prefer the compact FP16 blob written by ingestion; fall
+                # back to the FP32 list property for older data
+                if record["emb_f16"] is not None:
+                    vec = np.frombuffer(record["emb_f16"], dtype=np.float16).astype(np.float32)
+                elif record["emb"] is not None:
+                    vec = np.asarray(record["emb"], dtype=np.float32)
+                else:
+                    continue
+                vectors.append(vec)
+                chunks.append({
+                    "text": record["text"] or "",
+                    # Same keys build_context_and_sources reads, matching what
+                    # ingestion actually writes on the nodes
+                    "metadata": {
+                        "source_file": record["source_file"],
+                        "source_type": record["source_type"],
+                    },
+                })
+
+        if not vectors:
+            logger.warning("⚠ Local index: no embeddings in Neo4j yet, keeping Bolt retrieval")
+            return False
+
+        matrix = np.vstack(vectors)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        local_index_chunks = chunks
+        local_index_matrix = matrix / norms
+        logger.info("✓ Local vector index ready: %d chunks in memory", len(chunks))
+        return True
+    except Exception as e:
+        logger.warning("⚠ Could not build local vector index (%s), keeping Bolt retrieval", e)
         return False
 
+def local_index_search(query_embedding: List[float], top_k: int) -> List[Dict]:
+    """Brute-force cosine top-k against the in-memory matrix"""
+    q = np.asarray(query_embedding, dtype=np.float32)
+    norm = np.linalg.norm(q)
+    if norm:
+        q = q / norm
+    sims = local_index_matrix @ q
+    k = min(top_k, sims.shape[0])
+    top = np.argpartition(sims, -k)[-k:]
+    top = top[np.argsort(sims[top])[::-1]]
+    return [
+        {
+            "text": local_index_chunks[i]["text"],
+            "score": float(sims[i]),
+            "metadata": local_index_chunks[i]["metadata"],
+        }
+        for i in top
+    ]
+
+# Cap concurrent Neo4j round-trips so a burst of requests doesn't exhaust the
+# Bolt connection pool (langchain's Neo4jVector manages its own sync driver,
+# so async access goes through worker threads)
+neo4j_semaphore = asyncio.Semaphore(8)
+
+async def retrieve_chunks_async(query_embedding: List[float], top_k: int = 5) -> List[Dict]:
+    """Async wrapper for retrieval: runs the blocking Neo4j call in a worker
+    thread, bounded by the shared semaphore"""
+    async with neo4j_semaphore:
+        return await asyncio.to_thread(retrieve_relevant_chunks_by_vector, query_embedding, top_k)
+
 def retrieve_relevant_chunks(query: str, top_k: int = 5) -> List[Dict]:
     """Retrieve relevant chunks using your existing vector store"""
+    return retrieve_relevant_chunks_by_vector(embed_query(query), top_k)
+
+def retrieve_relevant_chunks_by_vector(query_embedding: List[float], top_k: int = 5) -> List[Dict]:
+    """Retrieve relevant chunks for an already-computed query embedding"""
     try:
+        if local_index_matrix is not None:
+            chunks = local_index_search(query_embedding, top_k)
+            logger.info("Retrieved %d relevant chunks from local index", len(chunks))
+            return chunks
+
         if not vector_store:
             logger.error("Vector store not initialized")
             return []
-        
-        # Use LangChain's similarity search with scores
-        results = vector_store.similarity_search_with_score(query, k=top_k)
-        
-        chunks = []
-        for doc, score in results:
-            chunks.append({
-                "text": doc.page_content,
-                "score": score,
-                "metadata": doc.metadata
-            })
-        
-        logger.info(f"Retrieved {len(chunks)} relevant chunks for query")
+
+        # Query the vector index directly instead of going through the
+        # LangChain wrapper - one Cypher round-trip that projects only the
+        # fields build_context_and_sources actually reads, no Document
+        # objects or full-metadata hydration in between
+        with get_bolt_driver().session(database="neo4j") as session:
+            result = session.run(
+                f"CALL db.index.vector.queryNodes('{INDEX_NAME}', $k, $emb) "
+                "YIELD node, score "
+                "RETURN node.text AS text, score, "
+                "node.source_file AS source_file, node.source_type AS source_type",
+                k=top_k, emb=query_embedding
+            )
+            chunks = [
+                {
+                    "text": record["text"] or "",
+                    "score": record["score"],
+                    "metadata": {
+                        "source_file": record["source_file"],
+                        "source_type": record["source_type"],
+                    },
+                }
+                for record in result
+            ]
+
+        logger.info("Retrieved %d relevant chunks for query", len(chunks))
         return chunks
         
     except Exception as e:
-        logger.error(f"Error retrieving chunks: {e}")
+        logger.error("Error retrieving chunks: %s", e)
         return []
 
-def process_model_response(response: str, model_id: str) -> str:
+# Lexical prefilter (ported from the app_complex experiment) that decides if
+# retrieved context is actually about the question. Everything is built once at
+# import time - no per-request set construction or regex compilation.
+STOP_WORDS = frozenset({
+    'the', 'is', 'are', 'was', 'were', 'a', 'an', 'and', 'or', 'but',
+    'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'what', 'who',
+    'where', 'when', 'why', 'how', 'do', 'does', 'did', 'will', 'would',
+    'could', 'should', 'can', 'may', 'might', 'have', 'has', 'had'
+})
+
+WORD_RE = re.compile(r"\b\w+\b")
+
+# Bytes-level tokenizer for the ASCII fast path in is_context_relevant:
+# one translate() lowers the whole buffer in C, skipping the Unicode case-fold
+WORD_RE_BYTES = re.compile(rb"[a-z0-9_]+")
+LOWER_TABLE = bytes.maketrans(bytes(range(65, 91)), bytes(range(97, 123)))
+
+# Questions about the bot itself shouldn't be answered from the Dune corpus.
+# One combined pattern = one scan instead of four sequential re.search calls.
+NON_DUNE_RE = re.compile(
+    r"\b(what is your name|who are you|what are you)\b"
+    r"|\b(your name|tell me about yourself)\b"
+    r"|\b(who created you|who made you)\b"
+    r"|\b(what can you do|what do you do)\b",
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=4096)
+def check_non_dune_keywords(question: str) -> bool:
+    """True for common questions about the bot itself that shouldn't use RAG.
+
+    Every phrase in NON_DUNE_RE contains the literal "you", so one C-level
+    substring probe screens out almost every real Dune question before the
+    alternation regex (which can backtrack per position) ever runs. With a
+    single shared literal this is the degenerate case of an Aho-Corasick
+    scan - str.find does the same single-pass work with no automaton."""
+    question_lower = question.lower()
+    if "you" not in question_lower:
+        return False
+    return NON_DUNE_RE.search(question_lower) is not None
+
+# Past this many context chars the numpy hashed-token overlap wins over the
+# Python token loop; below it the array setup cost dominates, so small inputs
+# (the normal /chat case) keep the streaming early-exit path
+RELEVANCE_NUMPY_THRESHOLD = 8192
+
+def _hashed_token_overlap(question_words, context_lower: str) -> int:
+    """Count distinct question words present in the context using uint64 hash
+    arrays - one C-level np.isin instead of a per-token Python loop"""
+    context_tokens = WORD_RE.findall(context_lower)
+    if not context_tokens:
+        return 0
+    q_hashes = np.fromiter(
+        (hash(w) & 0xFFFFFFFFFFFFFFFF for w in question_words),
+        dtype=np.uint64, count=len(question_words)
+    )
+    c_hashes = np.fromiter(
+        (hash(w) & 0xFFFFFFFFFFFFFFFF for w in context_tokens),
+        dtype=np.uint64, count=len(context_tokens)
+    )
+    return int(np.isin(q_hashes, c_hashes).sum())
+
+@lru_cache(maxsize=1024)
+def is_context_relevant(question: str, context: str, min_overlap: float = 0.2) -> bool:
+    """Check if the retrieved context is relevant to the question based on
+    keyword overlap, streaming the context tokens with an early exit.
+
+    Pure over its string arguments, so repeats (dev retries, eval reruns that
+    slip past the exact cache) become a dict hit instead of re-tokenizing up
+    to 6KB of context. 1024 entries * ~6KB context bounds this at a few MB."""
+    if not context or len(context.strip()) < 20:
+        return False
+
+    question_words = frozenset(WORD_RE.findall(question.lower())) - STOP_WORDS
+    if not question_words:
+        return False
+
+    # Stream context tokens and stop as soon as enough distinct question words
+    # have been seen - no full context word-set gets materialized
+    needed = math.ceil(min_overlap * len(question_words))
+
+    if len(context) > RELEVANCE_NUMPY_THRESHOLD:
+        return _hashed_token_overlap(question_words, context.lower()) >= needed
+
+    try:
+        # ASCII fast path: lowercase the whole buffer with one C-level
+        # translate and tokenize as bytes, no Unicode case-fold pass
+        context_bytes = context.encode("ascii")
+    except UnicodeEncodeError:
+        token_iter = (m.group() for m in WORD_RE.finditer(context.lower()))
+    else:
+        question_words = frozenset(word.encode() for word in question_words)
+        token_iter = (
+            m.group() for m in WORD_RE_BYTES.finditer(context_bytes.translate(LOWER_TABLE))
+        )
+
+    seen = set()
+    for word in token_iter:
+        if word in question_words and word not in seen:
+            seen.add(word)
+            if len(seen) >= needed:
+                return True
+    return False
+
+# Max characters of retrieved context to put in the prompt (~1500 tokens);
+# anything past this is wasted prefill and risks blowing the context window
+CTX_CHAR_BUDGET = 6000
+
+def dedupe_and_truncate_chunks(relevant_chunks: List[Dict]) -> List[Dict]:
+    """Drop duplicate chunks (overlapping windows from the same book come back
+    near-verbatim) and stop once the context character budget is used up"""
+    seen = set()
+    unique = []
+    used_chars = 0
+    for chunk in relevant_chunks:
+        # Normalize whitespace/case so trivially different copies still collapse
+        normalized = " ".join(chunk["text"].split()).lower()
+        if normalized in seen:
+            continue
+        seen.add(normalized)
+        if used_chars + len(chunk["text"]) > CTX_CHAR_BUDGET and unique:
+            break
+        used_chars += len(chunk["text"])
+        unique.append(chunk)
+    return unique
+
+def _source_tag(source_file: str, source_type: str) -> str:
+    """Suffix appended to a chunk in the prompt context, or '' if unsourced"""
+    label = source_file or source_type
+    return f" [Source: {label}]" if label else ""
+
+def build_context_and_sources(relevant_chunks: List[Dict]) -> tuple:
+    """Build the prompt context block plus the sources/top_sources metadata in a
+    single pass over the chunks instead of re-walking them per section"""
+    if not relevant_chunks:
+        return ("No specific context found in the Dune database for this query.", [], [])
+
+    context_parts = []
+    sources = []
+    top_sources = []
+    for i, chunk in enumerate(relevant_chunks):
+        text = chunk["text"]
+        metadata = chunk.get("metadata")
+        source_file = metadata.get("source_file", "") if metadata else ""
+        source_type = metadata.get("source_type", "") if metadata else ""
+
+        context_parts.append(text + _source_tag(source_file, source_type))
+
+        score = chunk.get("score")
+        sources.append({
+            "id": i + 1,
+            "content": text,
+            "score": round(score, 4) if score else None,
+            "preview": text[:150] + "..." if len(text) > 150 else text,
+            "file": (source_file or "Unknown") if metadata else "Database chunk",
+            "type": (source_type or "local") if metadata else "unknown"
+        })
+
+        # Keep the old top-3 format for backwards compatibility
+        if i < 3:
+            if metadata:
+                top_sources.append(f"{source_file or 'Unknown'} ({source_type or 'local'})")
+            else:
+                top_sources.append("Database chunk")
+
+    return "\n\n".join(context_parts), sources, top_sources
+
+def build_context(relevant_chunks: List[Dict]) -> str:
+    """Build just the prompt context block from retrieved chunks"""
+    return build_context_and_sources(relevant_chunks)[0]
+
+def process_model_response(response: str, model_config: Dict) -> str:
     """Process model response based on model-specific requirements"""
-    model_config = AVAILABLE_MODELS.get(model_id, AVAILABLE_MODELS[DEFAULT_MODEL])
-    
     # Remove thinking tags for models that use them (like DeepSeek R1)
     if model_config.get("remove_thinking", False):
-        response = re.sub(r"<think>.*?</think>", "", response, flags=re.DOTALL).strip()
-    
+        response = strip_think(response)
+
     return response
 
+# Dynamic batching settings for the model worker
+MAX_BATCH_SIZE = 8       # how many queued prompts to submit together
+MAX_BATCH_DELAY = 0.05   # how long to wait (seconds) for more prompts to arrive
+
+async def server_loop(queue: asyncio.Queue):
+    """Drain the model queue so the GPU runs one submission at a time at full
+    utilization. Prompts that arrive within MAX_BATCH_DELAY of each other get
+    batched into a single Ollama call to amortize model setup overhead"""
+    loop = asyncio.get_event_loop()
+    while True:
+        batch = [await queue.get()]
+
+        # Collect more prompts for a short window before submitting
+        deadline = loop.time() + MAX_BATCH_DELAY
+        while len(batch) < MAX_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # Group by model (each batch can only go to one LLM instance) and by
+        # rough prompt length, so a short question never gets padded out to the
+        # size of a context-heavy one in the same batch
+        groups = {}
+        for full_prompt, model_id, response_q in batch:
+            bucket = (model_id, len(full_prompt) // 2048)
+            groups.setdefault(bucket, []).append((full_prompt, response_q))
+
+        for (model_id, _), items in groups.items():
+            prompts = [prompt for prompt, _ in items]
+            try:
+                llm = get_llm_instance(model_id)
+                async with gpu_lock:
+                    results = await llm.abatch(prompts)
+            except Exception as e:
+                results = [e] * len(items)
+            for (_, response_q), result in zip(items, results):
+                await response_q.put(result)
+
+        for _ in batch:
+            queue.task_done()
+
+def restart_model_worker(task: asyncio.Task):
+    """If the model worker ever dies with an unhandled error, restart it so
+    queued /chat requests don't hang forever waiting on a dead consumer"""
+    global model_worker
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.error("Model worker crashed, restarting: %s", exc)
+        model_worker = asyncio.create_task(server_loop(model_queue))
+        model_worker.add_done_callback(restart_model_worker)
+
+async def generate_reply(full_prompt: str, model_id: str) -> str:
+    """Queue a prompt for the model worker and wait for its reply"""
+    response_q = asyncio.Queue()
+    await model_queue.put((full_prompt, model_id, response_q))
+    result = await response_q.get()
+    if isinstance(result, Exception):
+        raise result
+    return str(result)
+
+# Cap question size so a megabyte of text can't force huge embedding/prefill
+# work - FastAPI rejects oversize payloads with 422 before we touch Ollama
+MAX_QUESTION_CHARS = 4000
+MAX_REQUEST_BYTES = 16_384
+
 class Message(BaseModel):
-    text: str
+    text: constr(strip_whitespace=True, min_length=1, max_length=MAX_QUESTION_CHARS)
     use_rag: bool = True
     model: Optional[str] = DEFAULT_MODEL  # Model selection
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize vector store connection on startup"""
-    if not initialize_vector_store():
-        logger.warning("Failed to initialize vector store - RAG will not work properly")
+@app.middleware("http")
+async def limit_request_size(request: Request, call_next):
+    """Cut off oversize bodies at the transport layer before parsing them"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_REQUEST_BYTES:
+        return JSONResponse(status_code=413, content={"error": "Request body too large"})
+    return await call_next(request)
 
-@app.post("/chat")
-async def chat(message: Message):
-    try:
-        # Validate and set model
-        model_id = message.model if message.model in AVAILABLE_MODELS else DEFAULT_MODEL
-        model_config = AVAILABLE_MODELS[model_id]
-        
-        # Check for the special "glauco" case
-        if "glauco" in message.text.lower():
-            return {
-                "reply": "Glauco.",
-                "model_used": model_id,
-                "rag_used": False,
-                "sources_used": 0
-            }
-        
-        # Retrieve relevant context chunks - Skip retrieval if the user asked to disable RAG
-        relevant_chunks = (
-            retrieve_relevant_chunks(message.text, top_k=5)
-            if message.use_rag else []
-        )
-        
-        # Prepare context from retrieved chunks
-        if relevant_chunks:
-            context_parts = []
-            for chunk in relevant_chunks:
-                # Add source information if available
-                source_info = ""
-                if chunk.get("metadata"):
-                    source_file = chunk["metadata"].get("source_file", "")
-                    source_type = chunk["metadata"].get("source_type", "")
-                    if source_file:
-                        source_info = f" [Source: {source_file}]"
-                    elif source_type:
-                        source_info = f" [Source: {source_type}]"
-                
-                context_parts.append(f"{chunk['text']}{source_info}")
-            
-            context = "\n\n".join(context_parts)
-        else:
-            context = "No specific context found in the Dune database for this query."
-        
-        # Format the full prompt with context and model info
-        full_prompt = BASE_PROMPT.format(
-            model_name=model_config["name"],
-            context=context,
-            question=message.text
-        )
-        
-        # Get LLM instance for the selected model
-        llm = get_llm_instance(model_id)
-        
-        # Generate response using the selected LLM
-        response = llm.invoke(full_prompt)
-        reply_text = str(response)
-        
-        # Process response based on model requirements
-        reply_text = process_model_response(reply_text, model_id)
-        
-        # Prepare response with metadata
-        response_data = {
-            "reply": reply_text,
+async def warm_up_models():
+    """Pre-load every configured model so the first user doesn't pay the cold start"""
+    for model_id, model_config in AVAILABLE_MODELS.items():
+        get_llm_instance(model_id)
+        try:
+            # 1-token generation forces Ollama to load the model into memory now
+            warm_llm = OllamaLLM(
+                model=model_config["model_id"],
+                base_url=OLLAMA_URL,
+                keep_alive="30m",
+                num_predict=1
+            )
+            await warm_llm.ainvoke("hi")
+            logger.info("✓ Warmed up %s", model_config['name'])
+        except Exception as e:
+            logger.warning("Could not warm up %s: %s", model_config['name'], e)
+
+async def answer_message(message: Message) -> Dict:
+    """Full /chat pipeline for one message: caches -> retrieval -> generation.
+    Shared between the single and batch endpoints; concurrent callers are
+    coalesced by the model worker's dynamic batcher."""
+    # Validate and set model (one dict probe)
+    model_id, model_config = resolve_model(message.model)
+
+    # Check for the special "glauco" case (no lowercased copy of the message)
+    if GLAUCO_RE.search(message.text):
+        return {
+            "reply": "Glauco.",
             "model_used": model_id,
-            "model_name": model_config["name"],
-            "rag_used": bool(relevant_chunks),
-            "sources_used": len(relevant_chunks)
+            "rag_used": False,
+            "sources_used": 0
         }
+    
+    # Exact cache: identical questions come straight back from a dict lookup
+    text_key = exact_cache_key(model_id, message.use_rag, message.text)
+    exact_hit = exact_cache_lookup(text_key)
+    if exact_hit is not None:
+        return exact_hit
 
-        # Add source information with actual content
-        if relevant_chunks:
-            sources = []
-            for i, chunk in enumerate(relevant_chunks):  # Use same number as original (top 5 from retrieve_relevant_chunks)
-                source_data = {
-                    "id": i + 1,
-                    "content": chunk["text"],
-                    "score": round(chunk["score"], 4) if chunk.get("score") else None,
-                    "preview": chunk["text"][:150] + "..." if len(chunk["text"]) > 150 else chunk["text"]
-                }
-                
-                # Add metadata if available
-                if chunk.get("metadata"):
-                    source_file = chunk["metadata"].get("source_file", "Unknown")
-                    source_type = chunk["metadata"].get("source_type", "local")
-                    source_data["file"] = source_file
-                    source_data["type"] = source_type
-                else:
-                    source_data["file"] = "Database chunk"
-                    source_data["type"] = "unknown"
-                
-                sources.append(source_data)
-            
-            response_data["sources"] = sources
-            
-            # Keep the old format for backwards compatibility (showing top 3 as before)
-            response_data["top_sources"] = []
-            for chunk in relevant_chunks[:3]:  # Show top 3 sources as before
-                if chunk.get("metadata"):
-                    source_file = chunk["metadata"].get("source_file", "Unknown")
-                    source_type = chunk["metadata"].get("source_type", "local")
-                    response_data["top_sources"].append(f"{source_file} ({source_type})")
-                else:
-                    response_data["top_sources"].append("Database chunk")
-        
-        logger.info(f"Response generated using {model_config['name']} (RAG: {message.use_rag})")
-        return response_data
-        
+    # Cheapest filters first: questions about the bot itself or with almost
+    # no content words never benefit from retrieval, so decide to skip the
+    # Neo4j query before paying for anything else
+    question_tokens = set(WORD_RE.findall(message.text.lower())) - STOP_WORDS
+    skip_rag = (
+        not message.use_rag
+        or check_non_dune_keywords(message.text)
+        or len(question_tokens) < 2
+    )
+
+    # Embed the question exactly once - the same vector feeds both the
+    # semantic cache lookup and the Neo4j similarity search
+    raw_embedding = await asyncio.to_thread(embed_query, message.text)
+
+    # Kick off retrieval right away so the Neo4j round-trip overlaps with
+    # the semantic-cache lookup. Popular queries come straight out of the
+    # retrieval cache without touching Neo4j at all.
+    retrieval_key = (text_key[2], RETRIEVAL_TOP_K)
+    cached_chunks = None if skip_rag else retrieval_cache_get(retrieval_key)
+    chunks_task = (
+        None if skip_rag or cached_chunks is not None
+        else asyncio.create_task(retrieve_chunks_async(raw_embedding, RETRIEVAL_TOP_K))
+    )
+
+    # Semantic cache: paraphrases of an already-answered question get the
+    # cached reply instead of a fresh 5-10s generation
+    cache_key = (model_id, message.use_rag)
+    query_embedding = normalize_embedding(raw_embedding)
+    cached_response = semantic_cache_lookup(cache_key, query_embedding)
+    if cached_response is not None:
+        if chunks_task:
+            chunks_task.cancel()
+        return cached_response
+
+    # Retrieve relevant context chunks - already running in a worker thread
+    # if they weren't cached and the user didn't disable RAG
+    if cached_chunks is not None:
+        relevant_chunks = cached_chunks
+    elif chunks_task:
+        relevant_chunks = await chunks_task
+        retrieval_cache_put(retrieval_key, relevant_chunks)
+    else:
+        relevant_chunks = []
+    relevant_chunks = dedupe_and_truncate_chunks(relevant_chunks)
+
+    # Prepare context + sources metadata in one pass over the chunks
+    context, sources, top_sources = build_context_and_sources(relevant_chunks)
+
+    # Drop context that is lexically unrelated to the question so we don't
+    # waste prefill on it (the non-Dune check already ran before retrieval)
+    if relevant_chunks and not is_context_relevant(message.text, context):
+        relevant_chunks = []
+        context = "No specific context found in the Dune database for this query."
+
+
+    # Format the full prompt with context and model info
+    full_prompt = build_full_prompt(model_id, context, message.text)
+
+
+    # Generate response through the single model worker queue
+    reply_text = await generate_reply(full_prompt, model_id)
+    
+    # Process response based on model requirements
+    reply_text = process_model_response(reply_text, model_config)
+    
+    # Prepare response with metadata
+    response_data = {
+        "reply": reply_text,
+        "model_used": model_id,
+        "model_name": model_config["name"],
+        "rag_used": bool(relevant_chunks),
+        "sources_used": len(relevant_chunks)
+    }
+
+    # Add source information with actual content (built alongside the context)
+    if relevant_chunks:
+        response_data["sources"] = sources
+        response_data["top_sources"] = top_sources
+
+
+    exact_cache_store(text_key, response_data)
+    semantic_cache_store(cache_key, query_embedding, response_data)
+
+    logger.info("Response generated using %s (RAG: %s)", model_config['name'], message.use_rag)
+    return response_data
+    
+@app.post("/chat")
+async def chat(message: Message):
+    try:
+        return await answer_message(message)
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {e}")
+        logger.error("Error in chat endpoint: %s", e)
         return {
             "reply": "I encountered an error processing your question. Please try again.",
             "model_used": message.model or DEFAULT_MODEL,
@@ -323,6 +930,119 @@ async def chat(message: Message):
             "sources_used": 0
         }
 
+# Batch endpoint for eval runs etc. - one HTTP round-trip for many questions.
+# The messages run concurrently, so their generations land in the model
+# worker's 50ms batching window and go to Ollama as one llm.abatch call.
+MAX_BATCH_REQUESTS = 16
+
+class Batch(BaseModel):
+    requests: List[Message]
+
+@app.post("/batch-chat")
+async def batch_chat(batch: Batch):
+    if not batch.requests:
+        return {"replies": []}
+    if len(batch.requests) > MAX_BATCH_REQUESTS:
+        return JSONResponse(
+            status_code=413,
+            content={"error": f"Batch too large (max {MAX_BATCH_REQUESTS} requests)"}
+        )
+
+    async def safe_answer(message: Message) -> Dict:
+        # One bad question shouldn't fail the whole batch
+        try:
+            return await answer_message(message)
+        except Exception as e:
+            logger.error("Error in batch-chat item: %s", e)
+            return {
+                "reply": "I encountered an error processing your question. Please try again.",
+                "model_used": message.model or DEFAULT_MODEL,
+                "rag_used": False,
+                "sources_used": 0
+            }
+
+    # gather preserves order, so replies[i] answers requests[i]
+    replies = await asyncio.gather(*(safe_answer(m) for m in batch.requests))
+    return {"replies": list(replies)}
+
+@app.post("/chat/stream")
+async def chat_stream(message: Message):
+    """Streaming version of /chat - sends tokens as SSE events while they are generated"""
+    # Validate and set model (one dict probe)
+    model_id, model_config = resolve_model(message.model)
+
+    def sse_event(token: str) -> str:
+        return f"data: {json.dumps({'token': token})}\n\n"
+
+    async def token_stream():
+        try:
+            # Check for the special "glauco" case
+            if GLAUCO_RE.search(message.text):
+                yield f"data: {json.dumps({'token': 'Glauco.'})}\n\n"
+                yield "data: [DONE]\n\n"
+                return
+
+            relevant_chunks = []
+            if message.use_rag:
+                # Same retrieval cache as /chat - a popular question streams
+                # its first token without waiting on an embed + Neo4j trip
+                retrieval_key = (" ".join(message.text.split()).lower(), RETRIEVAL_TOP_K)
+                cached_chunks = retrieval_cache_get(retrieval_key)
+                if cached_chunks is not None:
+                    relevant_chunks = cached_chunks
+                else:
+                    query_embedding = await asyncio.to_thread(embed_query, message.text)
+                    relevant_chunks = await retrieve_chunks_async(query_embedding, RETRIEVAL_TOP_K)
+                    retrieval_cache_put(retrieval_key, relevant_chunks)
+            relevant_chunks = dedupe_and_truncate_chunks(relevant_chunks)
+            context = build_context(relevant_chunks)
+
+            full_prompt = build_full_prompt(model_id, context, message.text)
+
+            llm = get_llm_instance(model_id)
+
+            # Stateful streaming filter: <think> blocks are dropped on the fly
+            # so tokens flow out immediately instead of buffering the whole reply
+            strip_thinking = model_config.get("remove_thinking", False)
+            buffer = ""
+            in_think = False
+            async with gpu_lock:
+                async for token in llm.astream(full_prompt):
+                    if not strip_thinking:
+                        yield sse_event(token)
+                        continue
+
+                    buffer += token
+                    while True:
+                        if not in_think and "<think>" in buffer:
+                            head, buffer = buffer.split("<think>", 1)
+                            if head:
+                                yield sse_event(head)
+                            in_think = True
+                        elif in_think and "</think>" in buffer:
+                            _, buffer = buffer.split("</think>", 1)
+                            buffer = buffer.lstrip()
+                            in_think = False
+                        else:
+                            break
+
+                    # Flush the buffer but keep a small tail in case a tag is
+                    # split across token boundaries
+                    if not in_think and len(buffer) > 64:
+                        yield sse_event(buffer[:-16])
+                        buffer = buffer[-16:]
+
+            if buffer and not in_think:
+                yield sse_event(buffer)
+
+            yield "data: [DONE]\n\n"
+
+        except Exception as e:
+            logger.error("Error in chat stream: %s", e)
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(token_stream(), media_type="text/event-stream")
+
 @app.get("/models")
 async def get_available_models():
     """Get list of available models"""
@@ -339,6 +1059,19 @@ async def get_available_models():
         "default_model": DEFAULT_MODEL
     }
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Semantic cache statistics"""
+    total = semantic_cache_hits + semantic_cache_misses
+    return {
+        "entries": len(semantic_cache),
+        "max_entries": SEMANTIC_CACHE_MAX,
+        "threshold": SEMANTIC_CACHE_THRESHOLD,
+        "hits": semantic_cache_hits,
+        "misses": semantic_cache_misses,
+        "hit_rate": round(semantic_cache_hits / total, 4) if total else 0.0
+    }
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -346,8 +1079,8 @@ async def health_check():
         if not vector_store:
             return {"status": "unhealthy", "error": "Vector store not initialized"}
         
-        # Test a simple similarity search
-        test_results = vector_store.similarity_search("test", k=1)
+        # Test a simple similarity search (off the event loop)
+        test_results = await asyncio.to_thread(vector_store.similarity_search, "test", 1)
         
         return {
             "status": "healthy",
@@ -366,7 +1099,7 @@ async def health_check():
 async def search_chunks(query: str, limit: int = 10):
     """Direct search endpoint for testing"""
     try:
-        chunks = retrieve_relevant_chunks(query, top_k=limit)
+        chunks = await asyncio.to_thread(retrieve_relevant_chunks, query, limit)
         return {
             "query": query,
             "results_count": len(chunks),
@@ -380,7 +1113,7 @@ async def search_chunks(query: str, limit: int = 10):
             ]
         }
     except Exception as e:
-        logger.error(f"Error in search endpoint: {e}")
+        logger.error("Error in search endpoint: %s", e)
         return {"error": str(e)}
 
 # Test endpoint for model switching
@@ -391,9 +1124,8 @@ async def test_model(model_id: str, prompt: str = "Hello, introduce yourself bri
         if model_id not in AVAILABLE_MODELS:
             return {"error": f"Model {model_id} not available"}
         
-        llm = get_llm_instance(model_id)
-        response = llm.invoke(prompt)
-        processed_response = process_model_response(str(response), model_id)
+        response = await generate_reply(prompt, model_id)
+        processed_response = process_model_response(response, AVAILABLE_MODELS[model_id])
         
         return {
             "model_id": model_id,
@@ -403,18 +1135,9 @@ async def test_model(model_id: str, prompt: str = "Hello, introduce yourself bri
             "status": "success"
         }
     except Exception as e:
-        logger.error(f"Error testing model {model_id}: {e}")
+        logger.error("Error testing model %s: %s", model_id, e)
         return {
             "model_id": model_id,
             "error": str(e),
             "status": "error"
         }
-
-# Cleanup on shutdown
-@app.on_event("shutdown")
-async def shutdown_event():
-    global vector_store, llm_instances
-    if vector_store:
-        vector_store = None
-    llm_instances.clear()
-    logger.info("Cleaned up resources")
\ No newline at end of file
@@ -1,3 +1,9 @@
+# NOTE: kept for reference only. The RetrievalQA("stuff") chain below did its own
+# retrieval on top of the manual retriever path, so /chat-rag could hit Neo4j twice
+# per request plus LangChain chain overhead. The live app.py replaces all of this
+# with a single direct pipeline: similarity search by vector -> prompt template ->
+# llm.ainvoke. Don't resurrect the qa_chain - wire anything new through app.py.
+
 # import sys
 # import os
 # import re
@@ -1,6 +1,7 @@
+from functools import lru_cache
+
 from langchain_community.embeddings import OllamaEmbeddings
 from langchain_community.vectorstores import Neo4jVector
-from neo4j import GraphDatabase
 import os
 
 from dotenv import load_dotenv
@@ -15,18 +16,47 @@ NEO4J_URI      = os.getenv("NEO4J_URI")
 NEO4J_USER = os.getenv("NEO4J_USER")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 
+# One embedder shared by the cache below (module-level function because
+# lru_cache on a method would try to hash the pydantic model itself)
+_base_embeddings = OllamaEmbeddings(model="nomic-embed-text")
+
+
+@lru_cache(maxsize=2048)
+def _embed_query_cached(text):
+    # Stored as a tuple so cache hits can't mutate each other's vector
+    return tuple(_base_embeddings.embed_query(text))
+
+
+class CachedOllamaEmbeddings(OllamaEmbeddings):
+    """Embedder whose query path is memoized - every retriever call embeds
+    the question with a blocking HTTP round-trip to Ollama, so repeat
+    questions (and retries) hit the cache instead."""
+
+    def embed_query(self, text):
+        return list(_embed_query_cached(text))
+
+
+# Retriever singleton: Neo4jVector.from_existing_index spins up a fresh bolt
+# driver (routing discovery, TLS, pool warmup) every time it's called, so
+# build it once and share it across all chat requests
+_retriever = None
+
+
 def get_neo4j_retriever():
-    embeddings = OllamaEmbeddings(model="nomic-embed-text")
-
-    vectorstore = Neo4jVector.from_existing_index(
-        embeddings,
-        url=NEO4J_URI,
-        username=NEO4J_USER,
-        password=NEO4J_PASSWORD,
-        index_name="dune_chunks",
-        text_node_property="text",
-    )
-    return vectorstore.as_retriever()
+    global _retriever
+    if _retriever is None:
+        vectorstore = Neo4jVector.from_existing_index(
+            CachedOllamaEmbeddings(model="nomic-embed-text"),
+            url=NEO4J_URI,
+            username=NEO4J_USER,
+            password=NEO4J_PASSWORD,
+            index_name="dune_chunks",
+            text_node_property="text",
+        )
+        _retriever = vectorstore.as_retriever(
+            search_type="similarity", search_kwargs={"k": 5}
+        )
+    return _retriever
 
 if __name__ == "__main__":
     retriever = get_neo4j_retriever()
@@ -14,8 +14,8 @@ def get_all_characters(tx):
     result = tx.run("MATCH (c:Character) RETURN c.name AS name")
     return [record["name"] for record in result]
 
-with driver.session() as session:
-    characters = session.read_transaction(get_all_characters)
+with driver.session(database="neo4j", fetch_size=1000) as session:
+    characters = session.execute_read(get_all_characters)
     print("Characters:", characters)
 
 
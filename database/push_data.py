@@ -1,4 +1,5 @@
 import os
+import asyncio
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
 from base_dune_data import dune_data
@@ -9,7 +10,14 @@ uri = os.getenv("NEO4J_URI")
 user = os.getenv("NEO4J_USER")
 password = os.getenv("NEO4J_PASSWORD")
 
-driver = GraphDatabase.driver(uri, auth=(user, password))
+# Naming the database skips the server-side default-db lookup per session,
+# and the pool/timeout settings keep a slow Neo4j from hanging the script
+driver = GraphDatabase.driver(
+    uri,
+    auth=(user, password),
+    max_connection_pool_size=20,
+    connection_acquisition_timeout=60
+)
 embedding_model = OllamaEmbeddings(model="nomic-embed-text")  # Now matches retriever
 
 def check_neo4j_version(tx):
@@ -56,24 +64,49 @@ def create_vector_index(tx):
         print(f"Error creating index: {e}")
         return "none"
 
+# How many embedding calls to keep in flight at once - past ~8 the Ollama
+# server saturates and extra concurrency just queues up on its side
+EMBED_CONCURRENCY = 8
+
+async def embed_all(texts):
+    """Embed texts concurrently, at most EMBED_CONCURRENCY calls in flight"""
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def embed_one(text):
+        async with sem:
+            return await embedding_model.aembed_query(text)
+
+    # gather preserves input order, so vectors line up with texts
+    return await asyncio.gather(*(embed_one(t) for t in texts))
+
 def push_strings(tx, texts):
-    for i, text in enumerate(texts):
-        try:
-            vector = embedding_model.embed_query(text)
-            print(f"Processing text {i+1}/{len(texts)}: {text[:50]}...")
-            
-            # Use label "DuneChunk" to match your other pusher
-            tx.run(
-                """
-                MERGE (n:DuneChunk {text: $text})
-                SET n.embedding = $embedding, n.id = $id
-                """,
-                text=text,
-                embedding=vector,
-                id=i
-            )
-        except Exception as e:
-            print(f"Error processing text '{text}': {e}")
+    # Embed with several requests in flight - a single embed_documents call
+    # serializes on the Ollama server, while K concurrent aembed_query calls
+    # keep its GPU/CPU busy. The write stays one UNWIND statement - one bolt
+    # round-trip instead of a tx.run per text
+    texts = list(texts)
+    print(f"Embedding {len(texts)} texts ({EMBED_CONCURRENCY} concurrent calls)...")
+    try:
+        vectors = asyncio.run(embed_all(texts))
+    except Exception as e:
+        print(f"Error embedding texts: {e}")
+        return
+
+    rows = [
+        {"text": text, "embedding": vector, "id": i}
+        for i, (text, vector) in enumerate(zip(texts, vectors))
+    ]
+
+    if rows:
+        # Use label "DuneChunk" to match your other pusher
+        tx.run(
+            """
+            UNWIND $rows AS row
+            MERGE (n:DuneChunk {text: row.text})
+            SET n.embedding = row.embedding, n.id = row.id
+            """,
+            rows=rows
+        )
 
 def verify_data(tx):
     """Verify that data was inserted correctly"""
@@ -107,7 +140,7 @@ def cleanup_old_data(tx):
 
 # Main execution
 try:
-    with driver.session() as session:
+    with driver.session(database="neo4j", fetch_size=1000) as session:
         print("Cleaning up old data...")
         session.execute_write(cleanup_old_data)
         